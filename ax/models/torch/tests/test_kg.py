@@ -6,6 +6,7 @@
 
 from unittest import mock
 
+import ax.models.torch.botorch_modular.kg as kg_module
 import torch
 from ax.core.search_space import SearchSpaceDigest
 from ax.models.torch.botorch_modular.acquisition import Acquisition
@@ -22,34 +23,48 @@ from botorch.models.gp_regression import SingleTaskGP
 from botorch.utils.containers import TrainingData
 
 
-ACQUISITION_PATH = f"{Acquisition.__module__}"
-KG_PATH = f"{KnowledgeGradient.__module__}"
+# Tensors shared by all tests (none of the tests modify them).
+X = torch.tensor([[1.0, 2.0, 3.0], [2.0, 3.0, 4.0]])
+Y = torch.tensor([[3.0], [4.0]])
+YVAR = torch.tensor([[0.0], [2.0]])
+OBJECTIVE_WEIGHTS = torch.tensor([1.0])
+PENDING_OBSERVATIONS = [
+    torch.tensor([[1.0, 3.0, 4.0]]),
+    torch.tensor([[2.0, 6.0, 8.0]]),
+]
+OUTCOME_CONSTRAINTS = (torch.tensor([[1.0]]), torch.tensor([[0.5]]))
+INEQUALITY_CONSTRAINTS = [(torch.tensor([0, 1]), torch.tensor([-1.0, 1.0]), 1)]
+# bounds of the search space digest in the layout passed to the optimizer
+EXPECTED_BOUNDS = torch.tensor([[0.0, 0.0, 0.0], [10.0, 10.0, 10.0]])
 
 
 class AcquisitionSetUp:
-    def setUp(self):
-        self.botorch_model_class = SingleTaskGP
-        self.surrogate = Surrogate(botorch_model_class=self.botorch_model_class)
-        self.X = torch.tensor([[1.0, 2.0, 3.0], [2.0, 3.0, 4.0]])
-        self.Y = torch.tensor([[3.0], [4.0]])
-        self.Yvar = torch.tensor([[0.0], [2.0]])
-        self.training_data = TrainingData(X=self.X, Y=self.Y, Yvar=self.Yvar)
-        self.fidelity_features = [2]
-        self.surrogate.construct(
-            training_data=self.training_data, fidelity_features=self.fidelity_features
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # Constructing the surrogate fits a GP, so it is shared by all tests of a
+        # class; none of the tests modify it.
+        cls.botorch_model_class = SingleTaskGP
+        cls.surrogate = Surrogate(botorch_model_class=cls.botorch_model_class)
+        cls.X = X
+        cls.Y = Y
+        cls.Yvar = YVAR
+        cls.training_data = TrainingData(X=cls.X, Y=cls.Y, Yvar=cls.Yvar)
+        cls.fidelity_features = [2]
+        cls.surrogate.construct(
+            training_data=cls.training_data, fidelity_features=cls.fidelity_features
         )
-        self.search_space_digest = SearchSpaceDigest(
+        cls.search_space_digest = SearchSpaceDigest(
             feature_names=["a", "b", "c"],
             bounds=[(0.0, 10.0), (0.0, 10.0), (0.0, 10.0)],
             target_fidelities={2: 1.0},
         )
+
+    def setUp(self):
         self.botorch_acqf_class = qKnowledgeGradient
-        self.objective_weights = torch.tensor([1.0])
-        self.pending_observations = [
-            torch.tensor([[1.0, 3.0, 4.0]]),
-            torch.tensor([[2.0, 6.0, 8.0]]),
-        ]
-        self.outcome_constraints = (torch.tensor([[1.0]]), torch.tensor([[0.5]]))
+        self.objective_weights = OBJECTIVE_WEIGHTS
+        self.pending_observations = list(PENDING_OBSERVATIONS)
+        self.outcome_constraints = OUTCOME_CONSTRAINTS
         self.linear_constraints = None
         self.fixed_features = {1: 2.0}
         self.options = {
@@ -62,9 +77,7 @@ class AcquisitionSetUp:
             Keys.RAW_SAMPLES: 1024,
             Keys.FRAC_RANDOM: 0.2,
         }
-        self.inequality_constraints = [
-            (torch.tensor([0, 1]), torch.tensor([-1.0, 1.0]), 1)
-        ]
+        self.inequality_constraints = list(INEQUALITY_CONSTRAINTS)
 
 
 class OneShotAcquisitionTest(AcquisitionSetUp, TestCase):
@@ -82,11 +95,12 @@ class OneShotAcquisitionTest(AcquisitionSetUp, TestCase):
             options=self.options,
         )
 
-    @mock.patch(
-        f"{KG_PATH}.gen_one_shot_kg_initial_conditions",
+    @mock.patch.object(
+        kg_module,
+        "gen_one_shot_kg_initial_conditions",
         return_value=torch.tensor([1.0]),
     )
-    @mock.patch(f"{ACQUISITION_PATH}.Acquisition.optimize")
+    @mock.patch.object(Acquisition, "optimize")
     def test_optimize(self, mock_parent_optimize, mock_init_conditions):
         self.acquisition.optimize(
             n=1,
@@ -110,13 +124,13 @@ class OneShotAcquisitionTest(AcquisitionSetUp, TestCase):
             },
         )
         # can't use assert_called_with on bounds due to ambiguous bool comparison
-        expected_bounds = torch.tensor(
-            self.search_space_digest.bounds,
-            dtype=self.acquisition.dtype,
-            device=self.acquisition.device,
-        ).transpose(0, 1)
         self.assertTrue(
-            torch.equal(mock_init_conditions.call_args[1]["bounds"], expected_bounds)
+            torch.equal(
+                mock_init_conditions.call_args[1]["bounds"],
+                EXPECTED_BOUNDS.to(
+                    dtype=self.acquisition.dtype, device=self.acquisition.device
+                ),
+            )
         )
         self.optimizer_options[Keys.BATCH_INIT_CONDITIONS] = torch.tensor([1.0])
         # `OneShotAcquisition.optimize()` should call `Acquisition.optimize()` once.
@@ -145,9 +159,7 @@ class KnowledgeGradientTest(AcquisitionSetUp, TestCase):
             options=self.options,
         )
 
-    @mock.patch(
-        f"{ACQUISITION_PATH}.Acquisition.compute_model_dependencies", return_value={}
-    )
+    @mock.patch.object(Acquisition, "compute_model_dependencies", return_value={})
     def test_compute_model_dependencies(self, mock_Acquisition_compute):
         # `KnowledgeGradient.compute_model_dependencies` should call
         # `Acquisition.compute_model_dependencies` once.
@@ -159,7 +171,7 @@ class KnowledgeGradientTest(AcquisitionSetUp, TestCase):
         mock_Acquisition_compute.assert_called_once()
         self.assertEqual(dependencies, {})
 
-    @mock.patch(f"{KG_PATH}.OneShotAcquisition.optimize")
+    @mock.patch.object(OneShotAcquisition, "optimize")
     def test_optimize(self, mock_OneShot_optimize):
         # `KnowledgeGradient.optimize()` should call `OneShotAcquisition.optimize()`
         # once.
@@ -190,9 +202,7 @@ class MultiFidelityKnowledgeGradientTest(AcquisitionSetUp, TestCase):
             options=self.options,
         )
 
-    @mock.patch(
-        f"{ACQUISITION_PATH}.Acquisition.compute_model_dependencies", return_value={}
-    )
+    @mock.patch.object(Acquisition, "compute_model_dependencies", return_value={})
     def test_compute_model_dependencies(self, mock_Acquisition_compute):
         # `MultiFidelityKnowledgeGradient.compute_model_dependencies` should
         # call `Acquisition.compute_model_dependencies` once.
@@ -210,7 +220,7 @@ class MultiFidelityKnowledgeGradientTest(AcquisitionSetUp, TestCase):
         # Dependencies list should have `Keys.CURRENT_VALUE` in it
         self.assertTrue(Keys.CURRENT_VALUE in dependencies)
 
-    @mock.patch(f"{KG_PATH}.OneShotAcquisition.optimize")
+    @mock.patch.object(OneShotAcquisition, "optimize")
     def test_optimize(self, mock_OneShot_optimize):
         # `MultiFidelityKnowledgeGradient.optimize()` should call
         # `OneShotAcquisition.optimize()` once.
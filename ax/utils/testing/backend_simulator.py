@@ -4,14 +4,18 @@
 # This source code is licensed under the MIT license found in the
 # LICENSE file in the root directory of this source tree.
 
+import heapq
 import logging
 import random
 import time
-from dataclasses import dataclass
-from typing import Dict, List, Optional
+from collections import deque
+from dataclasses import dataclass, replace
+from typing import Deque, Dict, List, Optional, Tuple
 
+import numpy as np
 from ax.core.base_trial import TrialStatus
 from ax.utils.common.logger import get_logger
+from ax.utils.common.typeutils import not_none
 
 
 logger = get_logger(__name__)
@@ -29,6 +33,13 @@ class SimTrial:
     sim_start_time: Optional[float] = None
     # the queued time in seconds
     sim_queued_time: Optional[float] = None
+    # the end time in seconds (start time plus runtime, set once started)
+    sim_end_time: Optional[float] = None
+
+
+def _copy_trial(trial: SimTrial) -> SimTrial:
+    """Helper function for making a (shallow) copy of a trial"""
+    return SimTrial(**trial.__dict__)
 
 
 @dataclass
@@ -55,7 +66,8 @@ class BackendSimulatorOptions:
         failure_rate: The rate at which the trials are failing. For now, trials
             fail independently with at coin flip based on that rate.
         internal_clock: The initial state of the internal clock. If `None`,
-            the simulator uses ``time.time()`` as the clock.
+            the simulator uses ``time.monotonic()`` as the clock, so that
+            timestamps are only meaningful relative to each other.
         use_update_as_start_time: Whether the start time of a new trial should be logged
             as the current time (at time of update) or end time of previous trial.
             This makes sense when using the internal clock and the BackendSimulator
@@ -84,10 +96,10 @@ class BackendSimulatorState:
 
     options: BackendSimulatorOptions
     verbose_logging: bool
-    queued: List[Dict[str, Optional[float]]]
-    running: List[Dict[str, Optional[float]]]
-    failed: List[Dict[str, Optional[float]]]
-    completed: List[Dict[str, Optional[float]]]
+    queued: List[SimTrial]
+    running: List[SimTrial]
+    failed: List[SimTrial]
+    completed: List[SimTrial]
 
 
 class BackendSimulator:
@@ -113,7 +125,7 @@ class BackendSimulator:
             failure_rate: The rate at which the trials are failing. For now, trials
                 fail independently with at coin flip based on that rate.
             use_internal_clock: Whether or not to use an internal clock. If False,
-                the clock will be based on time.time().
+                the clock will be based on time.monotonic().
             queued: A list of SimTrial objects representing the queued trials
                 (only used for testing particular initialization cases)
             running: A list of SimTrial objects representing the running trials
@@ -129,17 +141,32 @@ class BackendSimulator:
         if options is None:
             options = BackendSimulatorOptions()
 
-        self.max_concurrency = options.max_concurrency
-        self.time_scaling = options.time_scaling
-        self.failure_rate = options.failure_rate
-        self.use_update_as_start_time = options.use_update_as_start_time
-        self._queued: List[SimTrial] = queued or []
-        self._running: List[SimTrial] = running or []
-        self._failed: List[SimTrial] = failed or []
-        self._completed: List[SimTrial] = completed or []
-        self._internal_clock = options.internal_clock
         self._verbose_logging = verbose_logging
-        self._init_state = self.state()
+        # keep private copies of the initial options and trials around for `reset`,
+        # since the simulator updates the trials it runs in place
+        self._init_options = replace(options)
+        self._init_queued = [_copy_trial(t) for t in queued or []]
+        self._init_running = [_copy_trial(t) for t in running or []]
+        self._init_failed = [_copy_trial(t) for t in failed or []]
+        self._init_completed = [_copy_trial(t) for t in completed or []]
+        self._set_options(options)
+        self._set_trials(
+            queued=queued or [],
+            running=running or [],
+            failed=failed or [],
+            completed=completed or [],
+        )
+
+    @property
+    def failure_rate(self) -> float:
+        """The rate at which trials fail"""
+        return self._failure_rate
+
+    @failure_rate.setter
+    def failure_rate(self, failure_rate: float) -> None:
+        self._failure_rate = failure_rate
+        # cache whether to flip a coin at all, so dispatch can skip it cheaply
+        self._failure_enabled = failure_rate > 0.0
 
     @property
     def num_queued(self) -> int:
@@ -164,38 +191,71 @@ class BackendSimulator:
     @property
     def use_internal_clock(self) -> bool:
         """Whether or not we are using the internal clock"""
-        return self._internal_clock is not None
+        return self._use_internal_clock
 
     @property
     def time(self) -> float:
         """The current time"""
-        return self._internal_clock if self.use_internal_clock else time.time()
+        return self._internal_clock if self._use_internal_clock else time.monotonic()
 
     def update(self) -> None:
         """Update the state of the simulator"""
-        if self.use_internal_clock:
+        if self._use_internal_clock:
             self._internal_clock += 1
-        self._update(self.time)
-        state = self.state()
-        logger.info(
-            "\n-----------\n"
-            f"Updated backend simulator state (time = {self.time}):\n"
-            f"** Queued:\n{format(state.queued)}\n"
-            f"** Running:\n{format(state.running)}\n"
-            f"** Failed:\n{format(state.failed)}\n"
-            f"** Completed:\n{format(state.completed)}\n"
-            f"-----------\n"
-        )
+        now = self.time
+        self._update(now)
+        # building the state snapshot is expensive, so only do so if it gets logged
+        if self._verbose_logging and logger.isEnabledFor(logging.INFO):
+            state = self.state()
+            logger.info(
+                "\n-----------\n"
+                "Updated backend simulator state (time = %s):\n"
+                "** Queued:\n%s\n"
+                "** Running:\n%s\n"
+                "** Failed:\n%s\n"
+                "** Completed:\n%s\n"
+                "-----------\n",
+                now,
+                _format_trial_list(state.queued),
+                _format_trial_list(state.running),
+                _format_trial_list(state.failed),
+                _format_trial_list(state.completed),
+            )
 
     def reset(self) -> None:
         """Reset the simulator."""
-        self.max_concurrency = self._init_state.options.max_concurrency
-        self.time_scaling = self._init_state.options.time_scaling
-        self._internal_clock = self._init_state.options.internal_clock
-        self._queued = [SimTrial(**args) for args in self._init_state.queued]
-        self._running = [SimTrial(**args) for args in self._init_state.running]
-        self._failed = [SimTrial(**args) for args in self._init_state.failed]
-        self._completed = [SimTrial(**args) for args in self._init_state.completed]
+        self._set_options(self._init_options)
+        self._set_trials(
+            queued=[_copy_trial(t) for t in self._init_queued],
+            running=[_copy_trial(t) for t in self._init_running],
+            failed=[_copy_trial(t) for t in self._init_failed],
+            completed=[_copy_trial(t) for t in self._init_completed],
+        )
+
+    def _set_options(self, options: BackendSimulatorOptions) -> None:
+        self.max_concurrency = options.max_concurrency
+        self.time_scaling = options.time_scaling
+        self.failure_rate = options.failure_rate
+        self.use_update_as_start_time = options.use_update_as_start_time
+        self._internal_clock = options.internal_clock
+        self._use_internal_clock = self._internal_clock is not None
+
+    def _set_trials(
+        self,
+        queued: List[SimTrial],
+        running: List[SimTrial],
+        failed: List[SimTrial],
+        completed: List[SimTrial],
+    ) -> None:
+        self._status_by_index: Dict[int, TrialStatus] = {}
+        self._queued: Deque[SimTrial] = deque(queued)
+        # min-heap of running trials keyed on their (simulated) end time
+        self._running: List[Tuple[float, int, SimTrial]] = []
+        for trial in running:
+            self._push_running(trial)
+        self._failed: List[SimTrial] = failed
+        self._completed: List[SimTrial] = completed
+        self._reindex_status()
 
     def state(self) -> BackendSimulatorState:
         """Return a state dictionary containing the state of the simulator"""
@@ -210,27 +270,23 @@ class BackendSimulator:
         return BackendSimulatorState(
             options=options,
             verbose_logging=self._verbose_logging,
-            queued=[q.__dict__.copy() for q in self._queued],
-            running=[r.__dict__.copy() for r in self._running],
-            failed=[r.__dict__.copy() for r in self._failed],
-            completed=[c.__dict__.copy() for c in self._completed],
+            queued=[_copy_trial(q) for q in self._queued],
+            running=[_copy_trial(r) for _, _, r in self._running],
+            failed=[_copy_trial(f) for f in self._failed],
+            completed=[_copy_trial(c) for c in self._completed],
         )
 
     @classmethod
     def from_state(cls, state: BackendSimulatorState):
         """Construct a simulator from a state"""
-        trial_types = {
-            "queued": state.queued,
-            "running": state.running,
-            "failed": state.failed,
-            "completed": state.completed,
-        }
-        trial_kwargs = {
-            key: [SimTrial(**kwargs) for kwargs in trial_types[key]]  # pyre-ignore [6]
-            for key in ("queued", "running", "failed", "completed")
-        }
+        # copy the trials so that running the simulator does not modify the state
         return cls(
-            options=state.options, verbose_logging=state.verbose_logging, **trial_kwargs
+            options=state.options,
+            verbose_logging=state.verbose_logging,
+            queued=[_copy_trial(q) for q in state.queued],
+            running=[_copy_trial(r) for r in state.running],
+            failed=[_copy_trial(f) for f in state.failed],
+            completed=[_copy_trial(c) for c in state.completed],
         )
 
     def run_trial(self, trial_index: int, runtime: float) -> None:
@@ -244,33 +300,57 @@ class BackendSimulator:
         Internally, the runtime is scaled by the `time_scaling` factor, so that
         the simulation can run arbitrarily faster than the underlying evaluation.
         """
+        # flip a coin to see if the trial fails (for now fail instantly)
+        # TODO: Allow failure behavior based on a survival rate
+        fail = self._failure_enabled and random.random() < self.failure_rate
+        self._dispatch_trial(trial_index, runtime, fail=fail, now=self.time)
+
+    def run_trials(self, trials: List[Tuple[int, float]]) -> None:
+        """Run a batch of simulated trials.
+
+        Unlike ``run_trial``, the failure coin flips for the batch are drawn at
+        once from numpy's global random number generator.
+
+        Args:
+            trials: A list of ``(trial_index, runtime)`` tuples, see ``run_trial``.
+                Trials are dispatched in the order in which they are passed.
+        """
+        if self._failure_enabled:
+            fail_mask = (np.random.random(len(trials)) < self.failure_rate).tolist()
+        else:
+            fail_mask = [False] * len(trials)
+
+        # all trials in the batch are dispatched at the same time
+        now = self.time
+        for (trial_index, runtime), fail in zip(trials, fail_mask):
+            self._dispatch_trial(trial_index, runtime, fail=fail, now=now)
+
+    def _dispatch_trial(
+        self, trial_index: int, runtime: float, fail: bool, now: float
+    ) -> None:
         # scale runtime to simulation
         sim_runtime = runtime / self.time_scaling
 
-        # flip a coin to see if the trial fails (for now fail instantly)
-        # TODO: Allow failure behavior based on a survival rate
-        if self.failure_rate > 0:
-            if random.random() < self.failure_rate:
-                self._failed.append(
-                    SimTrial(
-                        trial_index=trial_index,
-                        sim_runtime=sim_runtime,
-                        sim_start_time=self.time,
-                    )
+        if fail:
+            self._failed.append(
+                SimTrial(
+                    trial_index=trial_index,
+                    sim_runtime=sim_runtime,
+                    sim_start_time=now,
                 )
-                return
-
-        if self.num_running < self.max_concurrency:
+            )
+            self._status_by_index[trial_index] = TrialStatus.FAILED
+        elif self.num_running < self.max_concurrency:
             # note that though these are running for simulation purposes,
             # the trial status does not yet get updated (this is also how it
             # works in the real world, this requires updating the trial status manually)
-            curr_time = self.time
-            self._running.append(
+            self._push_running(
                 SimTrial(
                     trial_index=trial_index,
                     sim_runtime=sim_runtime,
-                    sim_start_time=curr_time,
-                    sim_queued_time=curr_time,
+                    sim_start_time=now,
+                    sim_queued_time=now,
+                    sim_end_time=now + sim_runtime,
                 )
             )
         else:
@@ -278,84 +358,73 @@ class BackendSimulator:
                 SimTrial(
                     trial_index=trial_index,
                     sim_runtime=sim_runtime,
-                    sim_queued_time=self.time,
+                    sim_queued_time=now,
                 )
             )
+            self._status_by_index[trial_index] = TrialStatus.STAGED
 
     def status(self) -> SimStatus:
         """Return the internal status of the simulator"""
         now = self.time
         return SimStatus(
             queued=[t.trial_index for t in self._queued],
-            running=[t.trial_index for t in self._running],
+            running=[t.trial_index for _, _, t in self._running],
             failed=[t.trial_index for t in self._failed],
-            time_remaining=[
-                # pyre-fixme[58]: `+` is not supported for operand types
-                #  `Optional[float]` and `float`.
-                t.sim_start_time + t.sim_runtime - now
-                for t in self._running
-            ],
+            time_remaining=[end_time - now for end_time, _, _ in self._running],
             completed=[t.trial_index for t in self._completed],
         )
 
     def lookup_trial_index_status(self, trial_index: int) -> Optional[TrialStatus]:
         """Lookup the trial status of a ``trial_index``."""
-        sim_status = self.status()
-        if trial_index in sim_status.queued:
-            return TrialStatus.STAGED
-        elif trial_index in sim_status.running:
-            return TrialStatus.RUNNING
-        elif trial_index in sim_status.completed:
-            return TrialStatus.COMPLETED
-        elif trial_index in sim_status.failed:
-            return TrialStatus.FAILED
-        return None
-
-    def _update_completed(self, timestamp: float) -> List[SimTrial]:
-        completed_since_last = []
-        new_running = []
-        for trial in self._running:
-            # pyre-fixme[58]: `+` is not supported for operand types
-            #  `Optional[float]` and `float`.
-            if timestamp > trial.sim_start_time + trial.sim_runtime:
-                completed_since_last.append(trial)
-            else:
-                new_running.append(trial)
-        self._running = new_running
-        self._completed.extend(completed_since_last)
-        return completed_since_last
+        return self._status_by_index.get(trial_index)
+
+    def _reindex_status(self) -> None:
+        """Rebuild the trial status lookup from the trial containers."""
+        # later assignments take precedence, so in case a trial index shows up in
+        # more than one container the earlier states of its lifecycle are reported
+        self._status_by_index = {}
+        for trials, status in (
+            (self._failed, TrialStatus.FAILED),
+            (self._completed, TrialStatus.COMPLETED),
+            ((t for _, _, t in self._running), TrialStatus.RUNNING),
+            (self._queued, TrialStatus.STAGED),
+        ):
+            for trial in trials:
+                self._status_by_index[trial.trial_index] = status
+
+    def _push_running(self, trial: SimTrial) -> None:
+        """Add a started trial to the heap of running trials."""
+        if trial.sim_end_time is None:
+            # trials passed in on initialization may not have the end time set
+            trial.sim_end_time = not_none(trial.sim_start_time) + trial.sim_runtime
+        heapq.heappush(
+            self._running, (not_none(trial.sim_end_time), trial.trial_index, trial)
+        )
+        self._status_by_index[trial.trial_index] = TrialStatus.RUNNING
 
     def _update(self, timestamp: float) -> None:
-        completed_since_last = self._update_completed(timestamp)
-
-        # if no trial has finished since the last call we're done
-        if len(completed_since_last) == 0:
-            return
-
-        # if at least one trial has finished, we need to graduate queued trials to
-        # running trials. Since all we need to keep track of is the start_time, we can
-        # do this retroactively.
-        # TODO: Improve performance / make less ad hoc by using a priority queue
-        for c in completed_since_last:
-            if self.num_queued > 0:
-                new_running_trial = self._queued.pop(0)
+        # Process completion events in the order in which they happen. Whenever a
+        # trial completes, the next queued trial (if any) starts running in its place.
+        # Since all we need to keep track of is the start_time, we can do this
+        # retroactively. The graduated trial's own completion event is pushed onto the
+        # heap, so trials that both started and finished in between the simulation
+        # updates are handled by the same loop.
+        while self._running and self._running[0][0] < timestamp:
+            end_time, _, trial = heapq.heappop(self._running)
+            self._completed.append(trial)
+            self._status_by_index[trial.trial_index] = TrialStatus.COMPLETED
+            if self._queued:
+                new_running_trial = self._queued.popleft()
                 sim_start_time = (
-                    # pyre-fixme[58]: `+` is not supported for operand types
-                    #  `Optional[float]` and `float`.
-                    c.sim_start_time + c.sim_runtime
-                    if not self.use_update_as_start_time
-                    else self.time
+                    end_time if not self.use_update_as_start_time else timestamp
                 )
                 new_running_trial.sim_start_time = sim_start_time
-                self._running.append(new_running_trial)
-
-        # since of course these graduated trials could both have started and finished in
-        # between the simulation updates, we need to re-run the update with the new
-        # state
-        self._update(timestamp)
+                new_running_trial.sim_end_time = (
+                    sim_start_time + new_running_trial.sim_runtime
+                )
+                self._push_running(new_running_trial)
 
 
-def format(trial_list: List[Dict[str, Optional[float]]]) -> str:
+def _format_trial_list(trial_list: List[SimTrial]) -> str:
     """Helper function for formatting a list"""
-    trial_list_str = [str(i) for i in trial_list]
-    return "\n".join(trial_list_str)
+    return "\n".join(str(i) for i in trial_list)
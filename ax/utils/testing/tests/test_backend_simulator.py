@@ -4,8 +4,11 @@
 # This source code is licensed under the MIT license found in the
 # LICENSE file in the root directory of this source tree.
 
+import random
 import time
 
+import numpy as np
+from ax.core.base_trial import TrialStatus
 from ax.utils.common.testutils import TestCase
 from ax.utils.testing.backend_simulator import BackendSimulator, BackendSimulatorOptions
 
@@ -40,12 +43,17 @@ class BackendSimulatorTest(TestCase):
         self.assertEqual(status.running, [0, 1])
         self.assertEqual(status.failed, [])
         self.assertEqual(status.completed, [])
+        self.assertEqual(sim.lookup_trial_index_status(0), TrialStatus.RUNNING)
+        self.assertEqual(sim.lookup_trial_index_status(2), TrialStatus.STAGED)
+        self.assertIsNone(sim.lookup_trial_index_status(3))
         time.sleep(1.5 * dt)
         sim.update()
         self.assertEqual(sim.num_queued, 0)
         self.assertEqual(sim.num_running, 1)
         self.assertEqual(sim.num_failed, 0)
         self.assertEqual(sim.num_completed, 2)
+        self.assertEqual(sim.lookup_trial_index_status(0), TrialStatus.COMPLETED)
+        self.assertEqual(sim.lookup_trial_index_status(2), TrialStatus.RUNNING)
 
         # extract state for later use
         state = sim.state()
@@ -61,17 +69,20 @@ class BackendSimulatorTest(TestCase):
         # test reset
         sim.max_concurrency = 3
         sim.time_scaling = 2.0
-        sim.failure_rate, 0.5
+        sim.failure_rate = 0.5
+        sim.use_update_as_start_time = True
         sim.reset()
         self.assertEqual(sim.max_concurrency, 2)
         self.assertEqual(sim.time_scaling, 1.0)
         self.assertEqual(sim.failure_rate, 0.0)
+        self.assertFalse(sim.use_update_as_start_time)
         self.assertEqual(sim.num_queued, 0)
         self.assertEqual(sim.num_running, 0)
         self.assertEqual(sim.num_failed, 0)
         self.assertEqual(sim.num_completed, 0)
 
         # test load state
+        state_running = [(t.trial_index, t.sim_start_time) for t in state.running]
         sim2 = BackendSimulator.from_state(state)
         self.assertEqual(sim2.max_concurrency, 2)
         self.assertEqual(sim2.time_scaling, 1.0)
@@ -85,6 +96,11 @@ class BackendSimulatorTest(TestCase):
         self.assertEqual(sim2.num_running, 0)
         self.assertEqual(sim2.num_failed, 0)
         self.assertEqual(sim2.num_completed, 3)
+        # updating the simulator does not modify the state it was loaded from
+        self.assertEqual(len(state.completed), 2)
+        self.assertEqual(
+            [(t.trial_index, t.sim_start_time) for t in state.running], state_running
+        )
 
         # test failure rate
         options = BackendSimulatorOptions(max_concurrency=2, failure_rate=1.0)
@@ -94,3 +110,50 @@ class BackendSimulatorTest(TestCase):
         self.assertEqual(sim3.num_running, 0)
         self.assertEqual(sim3.num_failed, 1)
         self.assertEqual(sim3.num_completed, 0)
+        self.assertEqual(sim3.lookup_trial_index_status(0), TrialStatus.FAILED)
+
+        # single trials flip their coin with `random`, leaving numpy's RNG untouched
+        sim5 = BackendSimulator(options=BackendSimulatorOptions(failure_rate=0.5))
+        np_state = np.random.get_state()[1].copy()
+        random.seed(0)
+        for i in range(10):
+            sim5.run_trial(i, dt)
+        self.assertTrue(np.array_equal(np.random.get_state()[1], np_state))
+        failed = sim5.status().failed
+        sim5.reset()
+        random.seed(0)
+        for i in range(10):
+            sim5.run_trial(i, dt)
+        self.assertEqual(sim5.status().failed, failed)
+
+        # test running a batch of trials
+        sim3.run_trials([(1, dt), (2, dt)])
+        self.assertEqual(sim3.num_running, 0)
+        self.assertEqual(sim3.num_failed, 3)
+        sim4 = BackendSimulator(options=BackendSimulatorOptions(max_concurrency=2))
+        sim4.run_trials([(0, dt), (1, dt), (2, dt)])
+        self.assertEqual(sim4.status().running, [0, 1])
+        self.assertEqual(sim4.status().queued, [2])
+
+    def test_backend_simulator_internal_clock(self):
+        options = BackendSimulatorOptions(max_concurrency=2, internal_clock=0.0)
+        sim = BackendSimulator(options=options)
+        sim.run_trials([(0, 0.25), (1, 2.5), (2, 0.25), (3, 1.0), (4, 1.0)])
+        self.assertEqual(sim.status().running, [0, 1])
+        self.assertEqual(sim.status().queued, [2, 3, 4])
+        # trial 2 starts and finishes in between updates, so trial 3 starts in
+        # its place before trial 1 completes and frees up the slot for trial 4
+        sim.update()
+        status = sim.status()
+        self.assertEqual(status.completed, [0, 2])
+        self.assertEqual(sorted(status.running), [1, 3])
+        self.assertEqual(status.queued, [4])
+        self.assertEqual(sorted(status.time_remaining), [0.5, 1.5])
+        sim.update()
+        status = sim.status()
+        self.assertEqual(status.completed, [0, 2, 3])
+        self.assertEqual(sorted(status.running), [1, 4])
+        self.assertEqual(sorted(status.time_remaining), [0.5, 0.5])
+        sim.update()
+        self.assertEqual(sim.status().completed, [0, 2, 3, 1, 4])
+        self.assertEqual(sim.lookup_trial_index_status(4), TrialStatus.COMPLETED)